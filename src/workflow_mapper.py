@@ -5,7 +5,7 @@ Updated for Canvas SDL1 format
 """
 
 import logging
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, Iterable, List, Any, Optional, Callable
 from opentrons_functions import OpentronsController
 from sdl1_operations import SDL1Operations
 
@@ -278,26 +278,29 @@ class WorkflowMapper:
         
         return result
     
-    def execute_workflow(self, workflow: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def execute_workflow(self, workflow: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Execute complete workflow from JSON
         
         Args:
-            workflow: List of JSON nodes
+            workflow: List of JSON nodes, or any iterable of them (e.g. a
+                stream); total_nodes then counts the nodes consumed
             
         Returns:
             Overall execution result
         """
         results = []
         failed_nodes = []
+        total_nodes = len(workflow) if hasattr(workflow, "__len__") else None
+        progress_total = total_nodes if total_nodes is not None else "?"
         
-        logging.info(f"Starting workflow execution with {len(workflow)} nodes")
+        logging.info(f"Starting workflow execution with {progress_total} nodes")
         
         for i, node in enumerate(workflow):
             node_type = node.get('type', 'unknown')
             node_id = node.get('id', f'node_{i}')
             
-            logging.info(f"Executing node {i+1}/{len(workflow)}: {node_type} ({node_id})")
+            logging.info(f"Executing node {i+1}/{progress_total}: {node_type} ({node_id})")
             
             result = self.execute_node(node)
             results.append({
@@ -324,12 +327,15 @@ class WorkflowMapper:
                 else:
                     logging.warning(f"Node {node_id} failed but continuing workflow")
         
+        if total_nodes is None:
+            total_nodes = len(results)
+        
         # Workflow summary
         summary = {
             "status": "completed" if not failed_nodes else "completed_with_errors",
-            "total_nodes": len(workflow),
+            "total_nodes": total_nodes,
             "executed_nodes": len(results),
-            "successful_nodes": len(workflow) - len(failed_nodes),
+            "successful_nodes": total_nodes - len(failed_nodes),
             "failed_nodes": failed_nodes,
             "results": results,
             "execution_log": self.execution_log,
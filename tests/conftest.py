@@ -0,0 +1,50 @@
+"""
+Shared pytest fixtures for the SDL1 workflow tests
+
+Each workflow file is parsed once per test session and the same dict is
+handed to every test that asks for it.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# The test modules import their shared helpers from this directory
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from helpers import DATA_DIR, build_workflow_view, load_workflow_json
+
+
+def _load(name):
+    return load_workflow_json(DATA_DIR / name)
+
+
+@pytest.fixture(scope="session")
+def canvas_new():
+    """Current Canvas export format"""
+    return _load("test_workflow-1753364156528.json")
+
+
+@pytest.fixture(scope="session")
+def canvas_old():
+    """Legacy Canvas export format"""
+    return _load("test_workflow-1753285688253.json")
+
+
+@pytest.fixture(scope="session")
+def zinc_workflow():
+    """Zinc deposition workflow in the nodes/edges layout"""
+    return _load("ZincDeposition_Complete_Workflow copy.json")
+
+
+@pytest.fixture(scope="session")
+def canvas_json(canvas_new):
+    """Canvas workflow used by the test_json_compatibility checks"""
+    return canvas_new
+
+
+@pytest.fixture(scope="session")
+def view(canvas_json):
+    """WorkflowView over the nodes of canvas_json"""
+    return build_workflow_view(canvas_json['workflow']['nodes'])
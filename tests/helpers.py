@@ -0,0 +1,166 @@
+"""
+Shared helpers for the SDL1 test scripts
+
+Workflow JSON is parsed with orjson when it is installed (stdlib json
+otherwise), and load_workflow_json caches each parsed file by path and
+modification time so repeated loads within a run reuse the same dict.
+Files above STREAM_THRESHOLD are streamed with ijson when it is installed.
+task_output/run_buffered let scripts run their tests on worker threads
+and still print each test's output as one uninterrupted block.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import re
+import sys
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_DIR / "src"
+DATA_DIR = REPO_DIR / "data"
+
+# Workflow files larger than this are streamed with ijson when it is installed
+STREAM_THRESHOLD = 8 * 1024 * 1024
+
+# SDL1 operation types share this prefix
+is_sdl1 = re.compile(r"sdl1").match
+
+
+def add_src_path():
+    """Make the modules under src/ importable"""
+    if str(SRC_DIR) not in sys.path:
+        sys.path.insert(0, str(SRC_DIR))
+
+
+@lru_cache(maxsize=None)
+def dry_controller():
+    """Dry-run OpentronsController shared by the tests of one process
+
+    Raises ImportError when the Opentrons dependencies are missing.
+    """
+    add_src_path()
+    from opentrons_functions import OpentronsController
+    return OpentronsController(dry_run=True)
+
+
+@lru_cache(maxsize=16)
+def _load_cached(path, mtime_ns):
+    return json_loads(Path(path).read_bytes())
+
+
+def load_workflow_json(path):
+    """Load a workflow JSON file, reusing the parsed dict while the file is unchanged
+
+    The dict is shared between callers and must not be mutated.
+    """
+    path = Path(path).resolve()
+    return _load_cached(str(path), path.stat().st_mtime_ns)
+
+
+
+@dataclass(frozen=True)
+class WorkflowView:
+    """Derived, read-only views over the nodes of a parsed Canvas workflow"""
+    nodes: tuple
+    op_types: frozenset
+    param_keys_per_node: tuple
+
+
+def build_workflow_view(nodes):
+    """Collect operation types and per-node parameter names in one pass"""
+    op_types = set()
+    param_keys = []
+    for node in nodes:
+        op_types.add(node.get('type'))
+        param_keys.append(frozenset(node.get('params', {})))
+    return WorkflowView(tuple(nodes), frozenset(op_types), tuple(param_keys))
+
+
+def iter_json_items(path, prefix):
+    """Yield the values at an ijson-style prefix such as 'workflow.nodes.item'
+    
+    Large files are streamed so only one item is in memory at a time; smaller
+    files (or a missing ijson) go through the cached load_workflow_json.
+    """
+    path = Path(path)
+    if ijson is not None and path.stat().st_size > STREAM_THRESHOLD:
+        with path.open('rb') as f:
+            yield from ijson.items(f, prefix, use_float=True)
+        return
+    
+    value = load_workflow_json(path)
+    for key in prefix.split('.'):
+        if key == 'item':
+            yield from value
+            return
+        value = value[key]
+    yield value
+
+
+# Output buffer of the test running on the current thread, if any
+_task = threading.local()
+
+
+class TaskOutput(io.TextIOBase):
+    """Stream proxy that sends writes from a buffered test thread to its buffer"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def write(self, text):
+        buffer = getattr(_task, "buffer", None)
+        return (buffer or self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+
+
+@contextlib.contextmanager
+def task_output():
+    """Route stdout, stderr and root log output through TaskOutput proxies"""
+    out, err = TaskOutput(sys.stdout), TaskOutput(sys.stderr)
+    # basicConfig handlers keep the stderr object they were created with
+    handlers = [h for h in logging.getLogger().handlers
+                if isinstance(h, logging.StreamHandler) and h.stream is err.stream]
+    sys.stdout, sys.stderr = out, err
+    for handler in handlers:
+        handler.setStream(err)
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = out.stream, err.stream
+        for handler in handlers:
+            handler.setStream(err.stream)
+
+
+def run_buffered(test_func):
+    """Run a test with its output captured, returning (result, output)
+
+    Only output written through task_output() proxies is captured.
+    """
+    buffer = _task.buffer = io.StringIO()
+    try:
+        result = test_func()
+    except Exception as e:
+        print(f"❌ Test failed with exception: {str(e)}")
+        result = False
+    finally:
+        _task.buffer = None
+    return result, buffer.getvalue()
@@ -3,15 +3,85 @@
 Test Runner for Battery SDL1 Workflow Mapper
 
 Runs all tests in the correct order and provides a comprehensive report.
+Tests run in-process by default; pass --isolate to run each in a subprocess.
 """
 
 import sys
 import os
+import io
+import contextlib
+import logging
+import runpy
+import signal
 import subprocess
 import time
+import traceback
 from datetime import datetime
 
-def run_test(test_file, description):
+TEST_TIMEOUT = 120  # 2 minute timeout
+
+
+class _TestTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise _TestTimeout()
+
+
+def _run_in_process(test_file):
+    """Execute a test script in this interpreter and capture its output"""
+    out, err = io.StringIO(), io.StringIO()
+    # Each script's logging.basicConfig must bind to this run's stderr buffer,
+    # so start from an empty root logger and restore it afterwards
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    root.handlers = []
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(TEST_TIMEOUT)
+    
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                runpy.run_path(test_file, run_name="__main__")
+                returncode = 0
+            except SystemExit as e:
+                if isinstance(e.code, int) or e.code is None:
+                    returncode = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    returncode = 1
+            except _TestTimeout:
+                raise
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        for handler in root.handlers:
+            handler.close()
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+    
+    return returncode, out.getvalue(), err.getvalue()
+
+
+def _run_isolated(test_file):
+    """Execute a test script in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, test_file],
+        capture_output=True,
+        text=True,
+        timeout=TEST_TIMEOUT
+    )
+    return result.returncode, result.stdout, result.stderr
+
+
+def run_test(test_file, description, isolate=False):
     """Run a single test file and return the result"""
     print(f"\n{'='*60}")
     print(f"Running: {description}")
@@ -21,44 +91,42 @@ def run_test(test_file, description):
     start_time = time.time()
     
     try:
-        result = subprocess.run(
-            [sys.executable, test_file],
-            capture_output=True,
-            text=True,
-            timeout=120  # 2 minute timeout
-        )
+        if isolate:
+            returncode, stdout, stderr = _run_isolated(test_file)
+        else:
+            returncode, stdout, stderr = _run_in_process(test_file)
         
         end_time = time.time()
         duration = end_time - start_time
         
-        success = result.returncode == 0
+        success = returncode == 0
         
-        print(f"Exit Code: {result.returncode}")
+        print(f"Exit Code: {returncode}")
         print(f"Duration: {duration:.2f}s")
         
-        if result.stdout:
-            print(f"\nSTDOUT:\n{result.stdout}")
+        if stdout:
+            print(f"\nSTDOUT:\n{stdout}")
         
-        if result.stderr:
-            print(f"\nSTDERR:\n{result.stderr}")
+        if stderr:
+            print(f"\nSTDERR:\n{stderr}")
         
         return {
             "test_file": test_file,
             "description": description,
             "success": success,
             "duration": duration,
-            "exit_code": result.returncode,
-            "stdout": result.stdout,
-            "stderr": result.stderr
+            "exit_code": returncode,
+            "stdout": stdout,
+            "stderr": stderr
         }
         
-    except subprocess.TimeoutExpired:
-        print(f"❌ Test timed out after 120 seconds")
+    except (subprocess.TimeoutExpired, _TestTimeout):
+        print(f"❌ Test timed out after {TEST_TIMEOUT} seconds")
         return {
             "test_file": test_file,
             "description": description,
             "success": False,
-            "duration": 120,
+            "duration": TEST_TIMEOUT,
             "exit_code": -1,
             "stdout": "",
             "stderr": "Test timed out"
@@ -75,12 +143,32 @@ def run_test(test_file, description):
             "stderr": str(e)
         }
 
+def write_report_entry(f, result):
+    """Append a single test result block to the report file"""
+    f.write(f"Test: {result['test_file']}\n")
+    f.write(f"Description: {result['description']}\n")
+    f.write(f"Success: {result['success']}\n")
+    f.write(f"Duration: {result['duration']:.2f}s\n")
+    f.write(f"Exit Code: {result['exit_code']}\n")
+    if result['stdout']:
+        f.write(f"STDOUT:\n{result['stdout']}\n")
+    if result['stderr']:
+        f.write(f"STDERR:\n{result['stderr']}\n")
+    f.write(f"{'-'*40}\n")
+
+def _excerpt(text, limit):
+    """Trim text to limit characters, marking a cut with '...'"""
+    return text if len(text) <= limit else text[:limit] + "..."
+
 def main():
     """Run all tests and generate a report"""
     print("🧪 Battery SDL1 Workflow Mapper - Test Suite")
     print(f"Started at: {datetime.now().isoformat()}")
     print("="*80)
     
+    # --isolate runs every test in its own interpreter to avoid shared state
+    isolate = "--isolate" in sys.argv[1:]
+    
     # Define tests in order of execution
     tests = [
         ("test_new_json_format.py", "Basic JSON Format Analysis"),
@@ -93,31 +181,45 @@ def main():
     results = []
     total_start_time = time.time()
     
-    # Run each test
-    for test_file, description in tests:
-        if os.path.exists(test_file):
-            result = run_test(test_file, description)
+    # Stream each test's output to the report as it completes
+    report_file = f"test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    with open(report_file, 'w', buffering=1) as report:
+        report.write(f"Battery SDL1 Test Report\n")
+        report.write(f"Generated: {datetime.now().isoformat()}\n\n")
+        
+        # Run each test
+        for test_file, description in tests:
+            if os.path.exists(test_file):
+                result = run_test(test_file, description, isolate=isolate)
+            else:
+                print(f"⚠️  Test file not found: {test_file}")
+                result = {
+                    "test_file": test_file,
+                    "description": description,
+                    "success": False,
+                    "duration": 0,
+                    "exit_code": -1,
+                    "stdout": "",
+                    "stderr": "File not found"
+                }
+            
+            write_report_entry(report, result)
+            # Only excerpts are needed for the summary below
+            result["stdout"] = result["stdout"][:500]
+            result["stderr"] = _excerpt(result["stderr"], 500)
             results.append(result)
-        else:
-            print(f"⚠️  Test file not found: {test_file}")
-            results.append({
-                "test_file": test_file,
-                "description": description,
-                "success": False,
-                "duration": 0,
-                "exit_code": -1,
-                "stdout": "",
-                "stderr": "File not found"
-            })
-    
-    total_duration = time.time() - total_start_time
+        
+        total_duration = time.time() - total_start_time
+        passed = sum(1 for r in results if r["success"])
+        
+        report.write(f"Total Duration: {total_duration:.2f}s\n")
+        report.write(f"Success Rate: {(passed/len(results)*100):.1f}%\n")
     
     # Generate summary report
     print(f"\n{'='*80}")
     print("📊 TEST SUMMARY REPORT")
     print(f"{'='*80}")
     
-    passed = sum(1 for r in results if r["success"])
     failed = len(results) - passed
     
     print(f"Total Tests: {len(results)}")
@@ -157,26 +259,6 @@ def main():
         if any("requires dependencies" in r["description"] for r in failed_tests):
             print("  📦 Dependency tests failed - install missing packages")
     
-    # Save detailed report
-    report_file = f"test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-    with open(report_file, 'w') as f:
-        f.write(f"Battery SDL1 Test Report\n")
-        f.write(f"Generated: {datetime.now().isoformat()}\n")
-        f.write(f"Total Duration: {total_duration:.2f}s\n")
-        f.write(f"Success Rate: {(passed/len(results)*100):.1f}%\n\n")
-        
-        for result in results:
-            f.write(f"Test: {result['test_file']}\n")
-            f.write(f"Description: {result['description']}\n")
-            f.write(f"Success: {result['success']}\n")
-            f.write(f"Duration: {result['duration']:.2f}s\n")
-            f.write(f"Exit Code: {result['exit_code']}\n")
-            if result['stdout']:
-                f.write(f"STDOUT:\n{result['stdout']}\n")
-            if result['stderr']:
-                f.write(f"STDERR:\n{result['stderr']}\n")
-            f.write(f"{'-'*40}\n")
-    
     print(f"\n📄 Detailed report saved to: {report_file}")
     
     # Exit with appropriate code
@@ -6,10 +6,26 @@ Tests the API server's ability to handle the new Canvas JSON structure
 
 import json
 import requests
+from requests.adapters import HTTPAdapter
+import socket
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Shared session so the tests reuse one keep-alive connection to the server
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
+
+def server_port_open(host="127.0.0.1", port=8000, timeout=0.1):
+    """Cheap TCP probe so a stopped server is detected without HTTP retries"""
+    s = socket.socket()
+    s.settimeout(timeout)
+    try:
+        return s.connect_ex((host, port)) == 0
+    finally:
+        s.close()
+
 def test_api_validation():
     """Test the API validation endpoint with new JSON format"""
     print("=== Testing API Validation Endpoint ===")
@@ -24,7 +40,7 @@ def test_api_validation():
         
         # Test validation endpoint
         print("Testing /canvas/validate endpoint...")
-        response = requests.post(
+        response = _SESSION.post(
             "http://localhost:8000/canvas/validate",
             json=canvas_json,
             headers={"Content-Type": "application/json"},
@@ -68,7 +84,7 @@ def test_api_dry_run():
         
         # Test dry-run execution
         print("Testing /canvas/execute/dry-run endpoint...")
-        response = requests.post(
+        response = _SESSION.post(
             "http://localhost:8000/canvas/execute/dry-run",
             json=canvas_json,
             headers={"Content-Type": "application/json"},
@@ -108,7 +124,7 @@ def test_api_status():
     print("\n=== Testing API Status ===")
     
     try:
-        response = requests.get("http://localhost:8000/status", timeout=10)
+        response = _SESSION.get("http://localhost:8000/status", timeout=10)
         
         if response.status_code == 200:
             result = response.json()
@@ -141,12 +157,7 @@ def test_individual_operations():
         # Test first few operations individually
         test_nodes = nodes[:3]  # Test first 3 nodes
         
-        for i, node in enumerate(test_nodes):
-            node_type = node.get('type')
-            node_id = node.get('id')
-            
-            print(f"\n--- Testing {node_type} ---")
-            
+        def validate_node(node):
             # Create a single-node workflow for testing
             single_node_workflow = {
                 "metadata": canvas_json['metadata'],
@@ -158,12 +169,21 @@ def test_individual_operations():
             }
             
             # Test validation for single node
-            response = requests.post(
+            return _SESSION.post(
                 "http://localhost:8000/canvas/validate",
                 json=single_node_workflow,
                 headers={"Content-Type": "application/json"},
                 timeout=15
             )
+        
+        # No batch endpoint on the server, so overlap the per-node requests instead
+        with ThreadPoolExecutor(max_workers=max(len(test_nodes), 1)) as executor:
+            responses = list(executor.map(validate_node, test_nodes))
+        
+        for node, response in zip(test_nodes, responses):
+            node_type = node.get('type')
+            
+            print(f"\n--- Testing {node_type} ---")
             
             if response.status_code == 200:
                 result = response.json()
@@ -186,7 +206,7 @@ def check_server_availability():
     print("=== Checking API Server Availability ===")
     
     try:
-        response = requests.get("http://localhost:8000/", timeout=5)
+        response = _SESSION.get("http://localhost:8000/", timeout=5)
         if response.status_code in [200, 404]:  # 404 is OK, means server is running
             print("✅ API server is available")
             return True
@@ -206,6 +226,12 @@ def main():
     print("🧪 Testing API with New Canvas JSON Format")
     print("=" * 50)
     
+    # Fail fast if nothing is listening on the API port
+    if not server_port_open():
+        print("\n❌ API server is not available. Cannot run API tests.")
+        print("Please start the API server first with: python api_server.py")
+        return False
+    
     # Check server availability first
     server_available = check_server_availability()
     
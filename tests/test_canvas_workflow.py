@@ -4,29 +4,51 @@ Test script for Canvas workflow execution
 Tests the refined mapper with the actual Canvas JSON output
 """
 
-import json
 import logging
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# Setup logging
+from helpers import load_workflow_json
+
+try:
+    from opentrons_functions import OpentronsController
+    from workflow_mapper import WorkflowMapper
+    HAVE_OT = True
+    _OT_IMPORT_ERROR = None
+except Exception as e:
+    HAVE_OT = False
+    _OT_IMPORT_ERROR = e
+
+# Setup logging; per-node progress is logged at DEBUG (enable with LOG_LEVEL=DEBUG)
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOG_LEVEL", "WARNING").upper(),
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
+log = logging.getLogger(__name__)
+
+CANVAS_PATH = '../data/test_workflow-1753364156528.json'
+VALIDATE_URL = "http://localhost:8000/canvas/validate"
+DRY_RUN_URL = "http://localhost:8000/canvas/execute/dry-run"
+
+# Keep-alive session shared by the API requests
+SESSION = requests.Session()
+SESSION.headers.update({"Content-Type": "application/json"})
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
 
 def test_canvas_workflow_direct():
     """Test Canvas workflow execution directly (without API server)"""
     print("=== Testing Canvas Workflow Direct Execution ===")
     
+    if not HAVE_OT:
+        print(f"Direct test skipped: could not import opentrons_functions/workflow_mapper: {_OT_IMPORT_ERROR}")
+        return False
+    
     try:
-        # Import modules
-        from opentrons_functions import OpentronsController
-        from workflow_mapper import WorkflowMapper
-        
         # Load Canvas JSON
-        with open('../data/test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
+        canvas_json = load_workflow_json(CANVAS_PATH)
         
         print(f"Loaded Canvas workflow: {canvas_json['metadata']['name']}")
         print(f"Node count: {len(canvas_json['workflow']['nodes'])}")
@@ -60,9 +82,10 @@ def test_canvas_workflow_direct():
             for failed in result['failed_nodes']:
                 print(f"  - {failed['node_type']} ({failed['node_id']}): {failed['error']}")
         
-        print(f"\nSDL1 Operations Log:")
-        for op in result['sdl1_operation_log']:
-            print(f"  - {op['operation']}: {op['result']['status']}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("SDL1 Operations Log:")
+            for op in result['sdl1_operation_log']:
+                log.debug("  - %s: %s", op['operation'], op['result']['status'])
         
         return True
         
@@ -70,46 +93,40 @@ def test_canvas_workflow_direct():
         print(f"Direct test failed: {str(e)}")
         return False
 
+def _post_json(url, payload):
+    return SESSION.post(url, json=payload)
+
 def test_canvas_workflow_api():
     """Test Canvas workflow execution via API"""
     print("\n=== Testing Canvas Workflow API ===")
     
     try:
         # Load Canvas JSON
-        with open('../data/test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
-        
-        # Test validation endpoint first
-        print("Testing validation endpoint...")
-        response = requests.post(
-            "http://localhost:8000/canvas/validate",
-            json=canvas_json,
-            headers={"Content-Type": "application/json"}
-        )
-        
-        if response.status_code == 200:
-            validation_result = response.json()
+        canvas_json = load_workflow_json(CANVAS_PATH)
+        
+        # Validation and dry-run are independent, so issue both requests concurrently
+        print("Testing validation and dry-run endpoints...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            validate_future = executor.submit(_post_json, VALIDATE_URL, canvas_json)
+            dry_run_future = executor.submit(_post_json, DRY_RUN_URL, canvas_json)
+            validate_response = validate_future.result()
+            dry_run_response = dry_run_future.result()
+        
+        if validate_response.status_code == 200:
+            validation_result = validate_response.json()
             print(f"Validation: {validation_result['validation']['valid']}")
             if not validation_result['validation']['valid']:
                 print(f"Validation errors: {validation_result['validation']['errors']}")
         else:
-            print(f"Validation failed: {response.status_code} - {response.text}")
+            print(f"Validation failed: {validate_response.status_code} - {validate_response.text}")
             return False
         
-        # Test dry-run execution
-        print("Testing dry-run execution...")
-        response = requests.post(
-            "http://localhost:8000/canvas/execute/dry-run",
-            json=canvas_json,
-            headers={"Content-Type": "application/json"}
-        )
-        
-        if response.status_code == 200:
-            execution_result = response.json()
+        if dry_run_response.status_code == 200:
+            execution_result = dry_run_response.json()
             print(f"Dry-run Status: {execution_result['execution']['status']}")
             print(f"Nodes executed: {execution_result['execution']['executed_nodes']}")
         else:
-            print(f"Dry-run failed: {response.status_code} - {response.text}")
+            print(f"Dry-run failed: {dry_run_response.status_code} - {dry_run_response.text}")
             return False
         
         print("API tests completed successfully!")
@@ -126,7 +143,7 @@ def generate_test_report():
     """Generate a test report"""
     print("\n=== Canvas Workflow Integration Test Report ===")
     print(f"Test Date: {datetime.now().isoformat()}")
-    print(f"Canvas JSON File: ../data/test_workflow-1753364156528.json")
+    print(f"Canvas JSON File: {CANVAS_PATH}")
     
     # Test direct execution
     direct_success = test_canvas_workflow_direct()
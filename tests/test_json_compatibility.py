@@ -6,24 +6,72 @@ Tests parameter extraction and mapping without Opentrons dependencies
 
 import json
 import logging
+import os
 import sys
 from datetime import datetime
+from pathlib import Path
 
-# Setup logging
+from helpers import build_workflow_view, load_workflow_json, orjson
+
+# Setup logging; per-node progress is logged at DEBUG (enable with LOG_LEVEL=DEBUG)
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOG_LEVEL", "WARNING").upper(),
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
+log = logging.getLogger(__name__)
+
+CANVAS_PATH = '../data/test_workflow-1753364156528.json'
+
+# Expected parameters for each operation type
+EXPECTED_PARAMS = {
+    "sdl1ExperimentSetup": [
+        "experiment_id", "test_well_address", "robot_ip", "robot_port",
+        "squidstat_port", "squidstat_channel", "validate_hardware_connection"
+    ],
+    "sdl1SolutionPreparation": [
+        "source_labware", "source_well", "target_labware", "target_well",
+        "volume", "pipette_type"
+    ],
+    "sdl1ElectrodeSetup": [
+        "electrode_type", "electrode_position", "target_well", "insertion_depth"
+    ],
+    "sdl1ElectrochemicalMeasurement": [
+        "com_port", "channel", "measurement_type", "cp_current", "cp_duration"
+    ],
+    "sdl1WashCleaning": [
+        "cleaning_cycles", "ultrasonic_time", "pump1_volume", "pump2_volume"
+    ],
+    "sdl1DataExport": [
+        "export_format", "file_path", "include_metadata", "data_tag"
+    ],
+    "sdl1SequenceControl": [
+        "loop_count", "loop_condition", "break_condition"
+    ],
+    "sdl1CycleCounter": [
+        "current_cycle", "total_cycles", "display_enabled", "cycle_type"
+    ]
+}
+EXPECTED_PARAM_SETS = {op: frozenset(params) for op, params in EXPECTED_PARAMS.items()}
+# Common parameters that are not reported as extras
+SKIP_PREFIXES = ('uo_', 'wait_', 'error_', 'log_', 'description')
 
-def test_json_structure():
+# Operations that should be in the mapper
+EXPECTED_MAPPER_OPS = frozenset({
+    "sdl1ExperimentSetup",
+    "sdl1SolutionPreparation",
+    "sdl1ElectrodeSetup",
+    "sdl1ElectrochemicalMeasurement",
+    "sdl1WashCleaning",
+    "sdl1DataExport",
+    "sdl1SequenceControl",
+    "sdl1CycleCounter"
+})
+
+def test_json_structure(canvas_json, view):
     """Test the JSON structure and parameter extraction"""
     print("=== Testing JSON Structure and Parameter Extraction ===")
     
     try:
-        # Load the new Canvas JSON
-        with open('../data/test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
-        
         print(f"✅ Loaded Canvas workflow: {canvas_json['metadata']['name']}")
         
         # Extract workflow structure
@@ -35,40 +83,41 @@ def test_json_structure():
         print(f"Workflow keys: {list(workflow_data.keys())}")
         print(f"Node count: {len(nodes)}")
         
-        # Test each node
-        operation_types = set()
-        all_params = set()
+        operation_types = view.op_types
+        all_params = frozenset().union(*view.param_keys_per_node)
         
-        for i, node in enumerate(nodes):
-            node_type = node.get('type')
-            node_params = node.get('params', {})
-            node_id = node.get('id')
-            
-            operation_types.add(node_type)
-            all_params.update(node_params.keys())
-            
-            print(f"\nNode {i+1}: {node_type}")
-            print(f"  ID: {node_id}")
-            print(f"  Params: {len(node_params)}")
-            
-            # Check required common parameters
-            required_params = ["uo_name", "description", "error_handling", "log_level"]
-            missing_params = [p for p in required_params if p not in node_params]
-            
-            if missing_params:
-                print(f"  ⚠️  Missing required params: {missing_params}")
-            else:
-                print(f"  ✅ All required params present")
-            
-            # Check for new metadata structure
-            if 'metadata' in node and 'parameterGroups' in node['metadata']:
-                param_groups = node['metadata']['parameterGroups']
-                print(f"  📋 Parameter groups: {list(param_groups.keys())}")
+        # Per-node details are only built when DEBUG logging is enabled
+        if log.isEnabledFor(logging.DEBUG):
+            out = []
+            for i, node in enumerate(nodes):
+                node_type = node.get('type')
+                node_params = node.get('params', {})
+                node_id = node.get('id')
+                
+                out.append(f"\nNode {i+1}: {node_type}")
+                out.append(f"  ID: {node_id}")
+                out.append(f"  Params: {len(node_params)}")
+                
+                # Check required common parameters
+                required_params = ["uo_name", "description", "error_handling", "log_level"]
+                missing_params = [p for p in required_params if p not in node_params]
+                
+                if missing_params:
+                    out.append(f"  ⚠️  Missing required params: {missing_params}")
+                else:
+                    out.append(f"  ✅ All required params present")
+                
+                # Check for new metadata structure
+                if 'metadata' in node and 'parameterGroups' in node['metadata']:
+                    param_groups = node['metadata']['parameterGroups']
+                    out.append(f"  📋 Parameter groups: {list(param_groups.keys())}")
+                
+                # Check for execution flow
+                if 'executionFlow' in node:
+                    exec_flow = node['executionFlow']
+                    out.append(f"  🔄 Execution flow: {exec_flow.get('executionOrder', 'unknown')}")
             
-            # Check for execution flow
-            if 'executionFlow' in node:
-                exec_flow = node['executionFlow']
-                print(f"  🔄 Execution flow: {exec_flow.get('executionOrder', 'unknown')}")
+            log.debug("Node details:%s", "\n".join(out))
         
         print(f"\n📊 Summary:")
         print(f"Operation types found: {sorted(operation_types)}")
@@ -80,77 +129,46 @@ def test_json_structure():
         print(f"❌ JSON structure test failed: {str(e)}")
         return False
 
-def test_parameter_mapping():
+def test_parameter_mapping(canvas_json, view):
     """Test parameter mapping for each operation type"""
     print("\n=== Testing Parameter Mapping ===")
     
     try:
-        # Load the new Canvas JSON
-        with open('../data/test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
-        
-        nodes = canvas_json['workflow']['nodes']
-        
-        # Define expected parameters for each operation type
-        expected_params = {
-            "sdl1ExperimentSetup": [
-                "experiment_id", "test_well_address", "robot_ip", "robot_port",
-                "squidstat_port", "squidstat_channel", "validate_hardware_connection"
-            ],
-            "sdl1SolutionPreparation": [
-                "source_labware", "source_well", "target_labware", "target_well",
-                "volume", "pipette_type"
-            ],
-            "sdl1ElectrodeSetup": [
-                "electrode_type", "electrode_position", "target_well", "insertion_depth"
-            ],
-            "sdl1ElectrochemicalMeasurement": [
-                "com_port", "channel", "measurement_type", "cp_current", "cp_duration"
-            ],
-            "sdl1WashCleaning": [
-                "cleaning_cycles", "ultrasonic_time", "pump1_volume", "pump2_volume"
-            ],
-            "sdl1DataExport": [
-                "export_format", "file_path", "include_metadata", "data_tag"
-            ],
-            "sdl1SequenceControl": [
-                "loop_count", "loop_condition", "break_condition"
-            ],
-            "sdl1CycleCounter": [
-                "current_cycle", "total_cycles", "display_enabled", "cycle_type"
-            ]
-        }
-        
-        for node in nodes:
-            node_type = node.get('type')
-            node_params = node.get('params', {})
-            
-            print(f"\n--- {node_type} ---")
-            
-            if node_type in expected_params:
-                expected = expected_params[node_type]
-                available = list(node_params.keys())
+        # Per-node details are only built when DEBUG logging is enabled
+        if log.isEnabledFor(logging.DEBUG):
+            out = []
+            for node, available in zip(view.nodes, view.param_keys_per_node):
+                node_type = node.get('type')
+                node_params = node.get('params', {})
                 
-                # Check which expected params are available
-                found_params = [p for p in expected if p in available]
-                missing_params = [p for p in expected if p not in available]
-                extra_params = [p for p in available if p not in expected and not p.startswith(('uo_', 'wait_', 'error_', 'log_', 'description'))]
+                out.append(f"\n--- {node_type} ---")
                 
-                print(f"  Expected params found: {len(found_params)}/{len(expected)}")
-                if found_params:
-                    print(f"    ✅ Found: {found_params}")
-                if missing_params:
-                    print(f"    ⚠️  Missing: {missing_params}")
-                if extra_params:
-                    print(f"    ➕ Extra: {extra_params[:5]}{'...' if len(extra_params) > 5 else ''}")
+                if node_type in EXPECTED_PARAMS:
+                    expected = EXPECTED_PARAMS[node_type]
+                    expected_set = EXPECTED_PARAM_SETS[node_type]
                 
-                # Test parameter value types
-                for param in found_params[:3]:  # Test first 3 params
-                    value = node_params[param]
-                    print(f"    {param}: {type(value).__name__} = {value}")
-            else:
-                print(f"  ⚠️  No expected parameters defined for {node_type}")
-                print(f"  Available params: {list(node_params.keys())[:5]}{'...' if len(node_params) > 5 else ''}")
+                    # Check which expected params are available (hash lookups, order preserved)
+                    found_params = [p for p in expected if p in available]
+                    missing_params = [p for p in expected if p not in available]
+                    extra_params = [p for p in node_params if p not in expected_set and not p.startswith(SKIP_PREFIXES)]
+                
+                    out.append(f"  Expected params found: {len(found_params)}/{len(expected)}")
+                    if found_params:
+                        out.append(f"    ✅ Found: {found_params}")
+                    if missing_params:
+                        out.append(f"    ⚠️  Missing: {missing_params}")
+                    if extra_params:
+                        out.append(f"    ➕ Extra: {extra_params[:5]}{'...' if len(extra_params) > 5 else ''}")
+                
+                    # Test parameter value types
+                    for param in found_params[:3]:  # Test first 3 params
+                        value = node_params[param]
+                        out.append(f"    {param}: {type(value).__name__} = {value}")
+                else:
+                    out.append(f"  ⚠️  No expected parameters defined for {node_type}")
+                    out.append(f"  Available params: {list(node_params.keys())[:5]}{'...' if len(node_params) > 5 else ''}")
+            
+            log.debug("Parameter mapping:%s", "\n".join(out))
         
         return True
         
@@ -158,39 +176,21 @@ def test_parameter_mapping():
         print(f"❌ Parameter mapping test failed: {str(e)}")
         return False
 
-def test_operation_coverage():
+def test_operation_coverage(canvas_json, view):
     """Test if all operations are covered in the mapper"""
     print("\n=== Testing Operation Coverage ===")
     
     try:
-        # Load the new Canvas JSON
-        with open('../data/test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
-        
-        nodes = canvas_json['workflow']['nodes']
-        
-        # Extract all operation types from JSON
-        json_operations = set(node.get('type') for node in nodes)
-        
-        # Define operations that should be in the mapper
-        expected_mapper_operations = {
-            "sdl1ExperimentSetup",
-            "sdl1SolutionPreparation", 
-            "sdl1ElectrodeSetup",
-            "sdl1ElectrochemicalMeasurement",
-            "sdl1WashCleaning",
-            "sdl1DataExport",
-            "sdl1SequenceControl",
-            "sdl1CycleCounter"
-        }
+        # Operation types from JSON
+        json_operations = view.op_types
         
         print(f"Operations in JSON: {sorted(json_operations)}")
-        print(f"Expected in mapper: {sorted(expected_mapper_operations)}")
+        print(f"Expected in mapper: {sorted(EXPECTED_MAPPER_OPS)}")
         
         # Check coverage
-        covered = json_operations & expected_mapper_operations
-        missing = json_operations - expected_mapper_operations
-        extra = expected_mapper_operations - json_operations
+        covered = json_operations & EXPECTED_MAPPER_OPS
+        missing = json_operations - EXPECTED_MAPPER_OPS
+        extra = EXPECTED_MAPPER_OPS - json_operations
         
         print(f"\n📊 Coverage Analysis:")
         print(f"  ✅ Covered operations: {len(covered)}/{len(json_operations)}")
@@ -212,35 +212,27 @@ def test_operation_coverage():
         print(f"❌ Operation coverage test failed: {str(e)}")
         return False
 
-def generate_compatibility_report():
+def generate_compatibility_report(canvas_json, view):
     """Generate a compatibility report"""
     print("\n=== Compatibility Report ===")
     
     try:
-        with open('../data/test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
-        
-        nodes = canvas_json['workflow']['nodes']
+        nodes = view.nodes
         
         report = {
             "workflow_name": canvas_json['metadata']['name'],
             "workflow_id": canvas_json['metadata']['id'],
             "node_count": len(nodes),
-            "operation_types": list(set(node.get('type') for node in nodes)),
-            "total_parameters": sum(len(node.get('params', {})) for node in nodes),
+            "operation_types": list(view.op_types),
+            "total_parameters": sum(map(len, view.param_keys_per_node)),
             "new_format_features": []
         }
         
-        # Check for new format features
-        for node in nodes:
-            if 'executionFlow' in node:
-                report["new_format_features"].append("executionFlow")
-                break
-        
-        for node in nodes:
-            if 'metadata' in node and 'parameterGroups' in node['metadata']:
-                report["new_format_features"].append("parameterGroups")
-                break
+        # Check for new format features (stops at the first node that has them)
+        if any('executionFlow' in node for node in nodes):
+            report["new_format_features"].append("executionFlow")
+        if any('parameterGroups' in (node.get('metadata') or {}) for node in nodes):
+            report["new_format_features"].append("parameterGroups")
         
         print(f"📋 Compatibility Report:")
         print(f"  Workflow: {report['workflow_name']} ({report['workflow_id']})")
@@ -250,8 +242,11 @@ def generate_compatibility_report():
         print(f"  New format features: {report['new_format_features']}")
         
         # Save report
-        with open('compatibility_report.json', 'w') as f:
-            json.dump(report, f, indent=2)
+        if orjson is not None:
+            report_bytes = orjson.dumps(report, option=orjson.OPT_INDENT_2)
+        else:
+            report_bytes = json.dumps(report, indent=2).encode()
+        Path('compatibility_report.json').write_bytes(report_bytes)
         print(f"  📄 Report saved to compatibility_report.json")
         
         return True
@@ -265,17 +260,25 @@ def main():
     print("🧪 Testing JSON Format Compatibility")
     print("=" * 50)
     
+    # Load the new Canvas JSON once and share it across the tests
+    try:
+        canvas_json = load_workflow_json(CANVAS_PATH)
+        view = build_workflow_view(canvas_json['workflow']['nodes'])
+    except Exception as e:
+        print(f"❌ Failed to load Canvas workflow: {str(e)}")
+        return False
+    
     # Test JSON structure
-    structure_ok = test_json_structure()
+    structure_ok = test_json_structure(canvas_json, view)
     
     # Test parameter mapping
-    mapping_ok = test_parameter_mapping()
+    mapping_ok = test_parameter_mapping(canvas_json, view)
     
     # Test operation coverage
-    coverage_ok = test_operation_coverage()
+    coverage_ok = test_operation_coverage(canvas_json, view)
     
     # Generate report
-    report_ok = generate_compatibility_report()
+    report_ok = generate_compatibility_report(canvas_json, view)
     
     # Summary
     print("\n" + "=" * 50)
@@ -4,24 +4,43 @@ Simplified test script to verify JSON structure and operation mapping
 without requiring external dependencies
 """
 
-import json
+import ast
+import logging
+import os
+import re
 import sys
 from pathlib import Path
 
+from helpers import load_workflow_json
+
+# Per-item listings are logged at DEBUG (enable with LOG_LEVEL=DEBUG)
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "WARNING").upper(),
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+log = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+WORKFLOW_PATH = ROOT / "data" / "ZincDeposition_Complete_Workflow copy.json"
+MAPPER_PATH = ROOT / "src" / "workflow_mapper.py"
+SDL1_PATH = ROOT / "src" / "sdl1_operations.py"
+
+# Function map entries such as "sdl1DataExport": self.sdl1_ops.sdl1DataExport
+_MAPPER_RE = re.compile(r'"(sdl1[A-Za-z0-9]+)"\s*:\s*self\.sdl1_ops\.sdl1')
+
 def test_workflow_json_structure():
     """Test that the workflow JSON has the expected structure"""
     print("🔍 Testing workflow JSON structure...")
     
     try:
         # Load the new workflow JSON
-        workflow_path = Path(__file__).parent.parent / "data" / "ZincDeposition_Complete_Workflow copy.json"
+        workflow_path = WORKFLOW_PATH
         
         if not workflow_path.exists():
             print(f"❌ Workflow file not found: {workflow_path}")
             return False, None, None
         
-        with open(workflow_path, 'r') as f:
-            workflow_json = json.load(f)
+        workflow_json = load_workflow_json(workflow_path)
         
         # Check top-level structure
         required_keys = ["workflow", "nodes", "edges", "metadata"]
@@ -56,10 +75,10 @@ def test_workflow_json_structure():
         
         print(f"✅ Node types found: {sorted(node_types)}")
         
-        # Print node details
-        print("\n📋 Node Details:")
+        # Log node details
+        log.debug("Node Details:")
         for detail in node_details:
-            print(f"   - {detail['type']}: {detail['label']} ({detail['id']})")
+            log.debug("   - %s: %s (%s)", detail['type'], detail['label'], detail['id'])
         
         # Check edges
         edges = workflow_json.get("edges", [])
@@ -77,35 +96,18 @@ def check_mapper_operations():
     
     try:
         # Read the workflow_mapper.py file to extract operation mappings
-        mapper_path = Path(__file__).parent.parent / "src" / "workflow_mapper.py"
+        mapper_path = MAPPER_PATH
         
         if not mapper_path.exists():
             print(f"❌ Mapper file not found: {mapper_path}")
             return False, None
         
-        with open(mapper_path, 'r') as f:
-            mapper_content = f.read()
-        
         # Extract SDL1 operations from the function map
-        sdl1_operations = set()
-        lines = mapper_content.split('\n')
-        in_function_map = False
-        
-        for line in lines:
-            line = line.strip()
-            if '"sdl1' in line and '":' in line and 'self.sdl1_ops.sdl1' in line:
-                # Extract operation name - only from function map entries
-                start = line.find('"sdl1')
-                end = line.find('"', start + 1)
-                if start != -1 and end != -1:
-                    operation = line[start+1:end]
-                    # Only add if it's a real operation (not a method call)
-                    if operation.startswith('sdl1') and not '_' in operation[4:]:
-                        sdl1_operations.add(operation)
-        
-        print(f"✅ Found {len(sdl1_operations)} SDL1 operations in mapper:")
+        sdl1_operations = set(_MAPPER_RE.findall(mapper_path.read_text()))
+        
+        print(f"✅ Found {len(sdl1_operations)} SDL1 operations in mapper (LOG_LEVEL=DEBUG lists them)")
         for op in sorted(sdl1_operations):
-            print(f"   - {op}")
+            log.debug("   - %s", op)
         
         return True, sdl1_operations
         
@@ -119,32 +121,22 @@ def check_sdl1_operations_implementation():
     
     try:
         # Read the sdl1_operations.py file to extract implemented methods
-        sdl1_path = Path(__file__).parent.parent / "src" / "sdl1_operations.py"
+        sdl1_path = SDL1_PATH
         
         if not sdl1_path.exists():
             print(f"❌ SDL1Operations file not found: {sdl1_path}")
             return False, None
         
-        with open(sdl1_path, 'r') as f:
-            sdl1_content = f.read()
-        
-        # Extract SDL1 method definitions
-        implemented_operations = set()
-        lines = sdl1_content.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('def sdl1') and '(' in line:
-                # Extract method name
-                start = line.find('def ') + 4
-                end = line.find('(')
-                if start != -1 and end != -1:
-                    method_name = line[start:end]
-                    implemented_operations.add(method_name)
+        # Extract SDL1 method definitions (including async and multi-line signatures)
+        tree = ast.parse(sdl1_path.read_text())
+        implemented_operations = {
+            node.name for node in ast.walk(tree)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith('sdl1')
+        }
         
-        print(f"✅ Found {len(implemented_operations)} SDL1 operations implemented:")
+        print(f"✅ Found {len(implemented_operations)} SDL1 operations implemented (LOG_LEVEL=DEBUG lists them)")
         for op in sorted(implemented_operations):
-            print(f"   - {op}")
+            log.debug("   - %s", op)
         
         return True, implemented_operations
         
@@ -157,7 +149,7 @@ def test_operation_coverage(workflow_node_types, mapper_operations, implemented_
     print("\n📋 Testing operation coverage...")
     
     # Filter to SDL1 operations only
-    sdl1_node_types = {nt for nt in workflow_node_types if nt.startswith("sdl1")}
+    sdl1_node_types = frozenset(nt for nt in workflow_node_types if nt.startswith("sdl1"))
     
     print(f"\nWorkflow requires: {sorted(sdl1_node_types)}")
     print(f"Mapper provides: {sorted(mapper_operations)}")
@@ -4,47 +4,74 @@ Test script to validate the new JSON format compatibility
 Tests the mapper with the new Canvas JSON structure
 """
 
-import json
+import contextlib
 import logging
 import sys
 import os
 
+from helpers import is_sdl1, iter_json_items, load_workflow_json
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
+# One template per node instead of one formatted line per attribute
+_NODE_SUMMARY = (
+    "\nNode {index}:\n"
+    "  ID: {id}\n"
+    "  Type: {type}\n"
+    "  Label: {label}\n"
+    "  Params count: {params_count}\n"
+    "  Has metadata: {has_metadata}\n"
+    "  Has executionFlow: {has_execution_flow}"
+)
+
+_NODE_ANALYSIS = (
+    "\nNode {index} analysis:\n"
+    "  Type: {type}\n"
+    "  ID: {id}\n"
+    "  Params available: {has_params}"
+)
+
 def test_json_parsing():
     """Test if we can parse the new JSON format"""
     print("=== Testing New JSON Format Parsing ===")
     
     try:
-        # Load the new Canvas JSON
-        with open('../data/test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
-        
-        print(f"✅ JSON loaded successfully")
-        print(f"Workflow name: {canvas_json['metadata']['name']}")
-        print(f"Workflow ID: {canvas_json['metadata']['id']}")
-        print(f"Node count: {len(canvas_json['workflow']['nodes'])}")
-        
-        # Analyze the structure
-        nodes = canvas_json['workflow']['nodes']
-        for i, node in enumerate(nodes):
-            print(f"\nNode {i+1}:")
-            print(f"  ID: {node['id']}")
-            print(f"  Type: {node['type']}")
-            print(f"  Label: {node['label']}")
-            print(f"  Params count: {len(node['params'])}")
-            print(f"  Has metadata: {'metadata' in node}")
-            print(f"  Has executionFlow: {'executionFlow' in node}")
+        # Read only the metadata and nodes of the new Canvas JSON
+        canvas_path = '../data/test_workflow-1753364156528.json'
+        # closing() releases the streamed file once the first item is read
+        with contextlib.closing(iter_json_items(canvas_path, 'metadata')) as items:
+            metadata = next(items)
+        
+        # Analyze the structure; nodes are consumed one at a time
+        out = []
+        node_count = 0
+        for i, node in enumerate(iter_json_items(canvas_path, 'workflow.nodes.item')):
+            node_count += 1
+            out.append(_NODE_SUMMARY.format(
+                index=i + 1,
+                id=node['id'],
+                type=node['type'],
+                label=node['label'],
+                params_count=len(node['params']),
+                has_metadata='metadata' in node,
+                has_execution_flow='executionFlow' in node
+            ))
             
             # Check if this is a new structure
             if 'metadata' in node and 'parameterGroups' in node['metadata']:
-                print(f"  ⚠️  New format detected with parameterGroups")
+                out.append(f"  ⚠️  New format detected with parameterGroups")
                 param_groups = node['metadata']['parameterGroups']
-                print(f"  Parameter groups: {list(param_groups.keys())}")
+                out.append(f"  Parameter groups: {list(param_groups.keys())}")
+        
+        print(f"✅ JSON loaded successfully")
+        print(f"Workflow name: {metadata['name']}")
+        print(f"Workflow ID: {metadata['id']}")
+        print(f"Node count: {node_count}")
+        sys.stdout.write("\n".join(out) + "\n")
         
         return True
         
@@ -52,7 +79,7 @@ def test_json_parsing():
         print(f"❌ JSON parsing failed: {str(e)}")
         return False
 
-def test_mapper_compatibility():
+def test_mapper_compatibility(canvas_new):
     """Test if the current mapper can handle the new format"""
     print("\n=== Testing Mapper Compatibility ===")
     
@@ -60,44 +87,45 @@ def test_mapper_compatibility():
         # Try to import the mapper (without opentrons dependency)
         sys.path.append('.')
         
-        # Load the JSON
-        with open('../data/test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
-        
         # Test the structure that the mapper expects
-        workflow_data = canvas_json.get("workflow", {})
+        workflow_data = canvas_new.get("workflow", {})
         nodes = workflow_data.get("nodes", [])
-        metadata = canvas_json.get("metadata", {})
+        metadata = canvas_new.get("metadata", {})
         
         print(f"✅ Structure extraction successful")
         print(f"Metadata keys: {list(metadata.keys())}")
         print(f"Workflow keys: {list(workflow_data.keys())}")
         
         # Test each node structure
+        out = []
         for i, node in enumerate(nodes):
             node_type = node.get("type")
             node_params = node.get("params", {})
             node_id = node.get("id", "unknown")
             
-            print(f"\nNode {i+1} analysis:")
-            print(f"  Type: {node_type}")
-            print(f"  ID: {node_id}")
-            print(f"  Params available: {len(node_params) > 0}")
+            out.append(_NODE_ANALYSIS.format(
+                index=i + 1,
+                type=node_type,
+                id=node_id,
+                has_params=len(node_params) > 0
+            ))
             
             # Check if this is an SDL1 operation
-            if node_type and node_type.startswith("sdl1"):
-                print(f"  ✅ SDL1 operation detected")
+            if node_type and is_sdl1(node_type):
+                out.append(f"  ✅ SDL1 operation detected")
                 
                 # Check for required common parameters
                 required_params = ["uo_name", "description", "error_handling", "log_level"]
                 missing_params = [p for p in required_params if p not in node_params]
                 
                 if missing_params:
-                    print(f"  ⚠️  Missing required params: {missing_params}")
+                    out.append(f"  ⚠️  Missing required params: {missing_params}")
                 else:
-                    print(f"  ✅ All required params present")
+                    out.append(f"  ✅ All required params present")
             else:
-                print(f"  ⚠️  Non-SDL1 operation: {node_type}")
+                out.append(f"  ⚠️  Non-SDL1 operation: {node_type}")
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         return True
         
@@ -105,24 +133,19 @@ def test_mapper_compatibility():
         print(f"❌ Mapper compatibility test failed: {str(e)}")
         return False
 
-def analyze_differences():
+def analyze_differences(canvas_new, canvas_old):
     """Analyze differences between old and new JSON formats"""
     print("\n=== Analyzing Format Differences ===")
     
     try:
-        # Load both files
-        with open('../data/test_workflow-1753364156528.json', 'r') as f:
-            new_json = json.load(f)
-
-        with open('../data/test_workflow-1753285688253.json', 'r') as f:
-            old_json = json.load(f)
+        new_json, old_json = canvas_new, canvas_old
         
         print("Comparing JSON structures...")
         
-        # Compare metadata
+        # Compare metadata (dict key views support set algebra directly)
         print(f"\nMetadata comparison:")
-        new_meta_keys = set(new_json['metadata'].keys())
-        old_meta_keys = set(old_json['metadata'].keys())
+        new_meta_keys = new_json['metadata'].keys()
+        old_meta_keys = old_json['metadata'].keys()
         print(f"  Common keys: {new_meta_keys & old_meta_keys}")
         print(f"  New keys: {new_meta_keys - old_meta_keys}")
         print(f"  Removed keys: {old_meta_keys - new_meta_keys}")
@@ -132,16 +155,16 @@ def analyze_differences():
         new_node = new_json['workflow']['nodes'][0]
         old_node = old_json['workflow']['nodes'][0]
         
-        new_node_keys = set(new_node.keys())
-        old_node_keys = set(old_node.keys())
+        new_node_keys = new_node.keys()
+        old_node_keys = old_node.keys()
         print(f"  Common keys: {new_node_keys & old_node_keys}")
         print(f"  New keys: {new_node_keys - old_node_keys}")
         print(f"  Removed keys: {old_node_keys - new_node_keys}")
         
         # Check params structure
         print(f"\nParams comparison:")
-        new_params = set(new_node['params'].keys())
-        old_params = set(old_node['params'].keys())
+        new_params = new_node['params'].keys()
+        old_params = old_node['params'].keys()
         print(f"  Common params: {new_params & old_params}")
         print(f"  New params: {new_params - old_params}")
         print(f"  Removed params: {old_params - new_params}")
@@ -149,8 +172,8 @@ def analyze_differences():
         # Check metadata structure
         if 'metadata' in new_node and 'metadata' in old_node:
             print(f"\nNode metadata comparison:")
-            new_meta = set(new_node['metadata'].keys())
-            old_meta = set(old_node['metadata'].keys())
+            new_meta = new_node['metadata'].keys()
+            old_meta = old_node['metadata'].keys()
             print(f"  Common keys: {new_meta & old_meta}")
             print(f"  New keys: {new_meta - old_meta}")
             print(f"  Removed keys: {old_meta - new_meta}")
@@ -169,18 +192,31 @@ def main():
     # Test JSON parsing
     json_ok = test_json_parsing()
     
+    # Both formats are parsed once and shared (pytest uses the conftest fixtures)
+    try:
+        canvas_new = load_workflow_json('../data/test_workflow-1753364156528.json')
+        canvas_old = load_workflow_json('../data/test_workflow-1753285688253.json')
+    except Exception as e:
+        print(f"❌ Failed to load workflow files: {str(e)}")
+        return False
+    
     # Test mapper compatibility
-    mapper_ok = test_mapper_compatibility()
+    mapper_ok = test_mapper_compatibility(canvas_new)
     
     # Analyze differences
-    diff_ok = analyze_differences()
+    diff_ok = analyze_differences(canvas_new, canvas_old)
     
     # Summary
-    print("\n" + "=" * 50)
-    print("📊 Test Summary:")
-    print(f"JSON Parsing: {'✅ PASS' if json_ok else '❌ FAIL'}")
-    print(f"Mapper Compatibility: {'✅ PASS' if mapper_ok else '❌ FAIL'}")
-    print(f"Difference Analysis: {'✅ PASS' if diff_ok else '❌ FAIL'}")
+    summary = [
+        ("JSON Parsing", json_ok),
+        ("Mapper Compatibility", mapper_ok),
+        ("Difference Analysis", diff_ok)
+    ]
+    sys.stdout.write("\n".join([
+        "\n" + "=" * 50,
+        "📊 Test Summary:",
+        *(f"{name}: {'✅ PASS' if ok else '❌ FAIL'}" for name, ok in summary)
+    ]) + "\n")
     
     if json_ok and mapper_ok and diff_ok:
         print("\n🎉 All tests passed! The new JSON format should be compatible.")
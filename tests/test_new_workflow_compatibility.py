@@ -4,35 +4,74 @@ Test script to verify compatibility of new workflow JSON with backend mapper
 Tests the ZincDeposition_Complete_Workflow copy.json file
 """
 
-import json
 import sys
 import os
-from pathlib import Path
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, Tuple
+
+from helpers import DATA_DIR, add_src_path, dry_controller, is_sdl1, load_workflow_json
+
+_WORKFLOW_JSON = DATA_DIR / "ZincDeposition_Complete_Workflow copy.json"
 
 # Add src directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+add_src_path()
+
+# Import the backend once; the tests report the failure instead of crashing
+try:
+    from workflow_mapper import WorkflowMapper
+    from sdl1_operations import SDL1Operations
+    HAVE_OT = True
+    _OT_IMPORT_ERROR = None
+except ImportError as e:
+    HAVE_OT = False
+    _OT_IMPORT_ERROR = e
+
+@lru_cache(maxsize=None)
+def _mapper():
+    return WorkflowMapper(dry_controller())
+
+@lru_cache(maxsize=None)
+def _sdl1_ops():
+    return SDL1Operations(dry_controller())
 
-def test_workflow_json_structure():
+@dataclass(frozen=True)
+class WorkflowIndex:
+    """Node lookups shared by the structure, coverage and parameter tests"""
+    types: FrozenSet[str]
+    sdl1_nodes: Tuple[Tuple[dict, dict], ...]  # (node, node parameters)
+
+def build_workflow_index(nodes):
+    """Build the node type set and SDL1 (node, parameters) pairs in one pass"""
+    types = set()
+    sdl1_nodes = []
+    for node in nodes:
+        node_type = node.get("type")
+        if not node_type:
+            continue
+        types.add(node_type)
+        if is_sdl1(node_type):
+            sdl1_nodes.append((node, node.get("data", {}).get("parameters", {})))
+    return WorkflowIndex(frozenset(types), tuple(sdl1_nodes))
+
+def test_workflow_json_structure(zinc_workflow):
     """Test that the workflow JSON has the expected structure"""
     print("🔍 Testing workflow JSON structure...")
     
     try:
-        # Load the new workflow JSON
-        workflow_path = Path(__file__).parent.parent / "data" / "ZincDeposition_Complete_Workflow copy.json"
+        # The new workflow JSON (None when the file is missing)
+        if zinc_workflow is None:
+            print(f"❌ Workflow file not found: {_WORKFLOW_JSON}")
+            return False, None, None
         
-        if not workflow_path.exists():
-            print(f"❌ Workflow file not found: {workflow_path}")
-            return False
-        
-        with open(workflow_path, 'r') as f:
-            workflow_json = json.load(f)
+        workflow_json = zinc_workflow
         
         # Check top-level structure
         required_keys = ["workflow", "nodes", "edges", "metadata"]
         for key in required_keys:
             if key not in workflow_json:
                 print(f"❌ Missing required key: {key}")
-                return False
+                return False, None, None
         
         # Check workflow metadata
         workflow_info = workflow_json.get("workflow", {})
@@ -44,20 +83,16 @@ def test_workflow_json_structure():
         nodes = workflow_json.get("nodes", [])
         print(f"✅ Found {len(nodes)} nodes")
         
-        # Extract node types
-        node_types = set()
-        for node in nodes:
-            node_type = node.get("type")
-            if node_type:
-                node_types.add(node_type)
+        # Index node types and SDL1 parameters for the later tests
+        index = build_workflow_index(nodes)
         
-        print(f"✅ Node types found: {sorted(node_types)}")
+        print(f"✅ Node types found: {sorted(index.types)}")
         
         # Check edges
         edges = workflow_json.get("edges", [])
         print(f"✅ Found {len(edges)} edges")
         
-        return True, workflow_json, node_types
+        return True, workflow_json, index
         
     except Exception as e:
         print(f"❌ Error loading workflow JSON: {e}")
@@ -67,13 +102,13 @@ def test_mapper_compatibility():
     """Test that the mapper can handle all node types in the workflow"""
     print("\n🔧 Testing mapper compatibility...")
     
+    if not HAVE_OT:
+        print(f"❌ Error initializing mapper: {_OT_IMPORT_ERROR}")
+        return False, None
+    
     try:
-        from workflow_mapper import WorkflowMapper
-        from opentrons_functions import OpentronsController
-        
-        # Initialize controller and mapper
-        controller = OpentronsController(dry_run=True)
-        mapper = WorkflowMapper(controller)
+        # Initialize controller and mapper (shared across tests)
+        mapper = _mapper()
         
         # Get available operations from mapper
         available_operations = set(mapper.function_map.keys())
@@ -85,13 +120,13 @@ def test_mapper_compatibility():
         print(f"❌ Error initializing mapper: {e}")
         return False, None
 
-def test_node_type_coverage(workflow_node_types, mapper_operations):
+def test_node_type_coverage(index, mapper_operations):
     """Test that all workflow node types are supported by the mapper"""
     print("\n📋 Testing node type coverage...")
     
     # Filter to SDL1 operations only
-    sdl1_node_types = {nt for nt in workflow_node_types if nt.startswith("sdl1")}
-    sdl1_mapper_ops = {op for op in mapper_operations if op.startswith("sdl1")}
+    sdl1_node_types = frozenset(node["type"] for node, _ in index.sdl1_nodes)
+    sdl1_mapper_ops = {op for op in mapper_operations if is_sdl1(op)}
     
     print(f"Workflow SDL1 node types: {sorted(sdl1_node_types)}")
     print(f"Mapper SDL1 operations: {sorted(sdl1_mapper_ops)}")
@@ -111,29 +146,25 @@ def test_node_type_coverage(workflow_node_types, mapper_operations):
     
     return True
 
-def test_parameter_compatibility(workflow_json):
+def test_parameter_compatibility(index):
     """Test that node parameters are compatible with operation implementations"""
     print("\n⚙️  Testing parameter compatibility...")
     
+    if not HAVE_OT:
+        print(f"❌ Error testing parameter compatibility: {_OT_IMPORT_ERROR}")
+        return False
+    
     try:
-        from sdl1_operations import SDL1Operations
-        from opentrons_functions import OpentronsController
-        
-        controller = OpentronsController(dry_run=True)
-        sdl1_ops = SDL1Operations(controller)
+        sdl1_ops = _sdl1_ops()
         
-        nodes = workflow_json.get("nodes", [])
         compatibility_issues = []
         
-        for node in nodes:
-            node_type = node.get("type")
+        out = []
+        for node, node_params in index.sdl1_nodes:
+            node_type = node["type"]
             node_id = node.get("id")
-            node_params = node.get("data", {}).get("parameters", {})
-            
-            if not node_type.startswith("sdl1"):
-                continue
             
-            print(f"  Checking {node_type} ({node_id})...")
+            out.append(f"  Checking {node_type} ({node_id})...")
             
             # Check if operation exists
             if hasattr(sdl1_ops, node_type):
@@ -146,14 +177,16 @@ def test_parameter_compatibility(workflow_json):
                     test_params["dry_run"] = True
                     
                     # This would normally execute, but we're in dry run mode
-                    print(f"    ✅ {node_type} parameters appear compatible")
+                    out.append(f"    ✅ {node_type} parameters appear compatible")
                     
                 except Exception as param_error:
                     compatibility_issues.append(f"{node_type} ({node_id}): {param_error}")
-                    print(f"    ⚠️  Parameter issue: {param_error}")
+                    out.append(f"    ⚠️  Parameter issue: {param_error}")
             else:
                 compatibility_issues.append(f"{node_type}: Operation not implemented")
-                print(f"    ❌ Operation not implemented")
+                out.append(f"    ❌ Operation not implemented")
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         if compatibility_issues:
             print(f"\n⚠️  Found {len(compatibility_issues)} compatibility issues:")
@@ -173,8 +206,11 @@ def main():
     print("🧪 Testing New Workflow JSON Compatibility")
     print("=" * 50)
     
+    # Parse the workflow once; pytest passes the conftest fixture instead
+    zinc_workflow = load_workflow_json(_WORKFLOW_JSON) if _WORKFLOW_JSON.exists() else None
+    
     # Test 1: JSON structure
-    structure_ok, workflow_json, node_types = test_workflow_json_structure()
+    structure_ok, workflow_json, index = test_workflow_json_structure(zinc_workflow)
     if not structure_ok:
         print("\n❌ Workflow JSON structure test failed")
         return False
@@ -186,23 +222,27 @@ def main():
         return False
     
     # Test 3: Node type coverage
-    coverage_ok = test_node_type_coverage(node_types, mapper_operations)
+    coverage_ok = test_node_type_coverage(index, mapper_operations)
     if not coverage_ok:
         print("\n❌ Node type coverage test failed")
         return False
     
     # Test 4: Parameter compatibility
-    params_ok = test_parameter_compatibility(workflow_json)
+    params_ok = test_parameter_compatibility(index)
     if not params_ok:
         print("\n⚠️  Parameter compatibility test found issues")
     
-    print("\n" + "=" * 50)
     if coverage_ok:
-        print("✅ NEW WORKFLOW JSON IS COMPATIBLE WITH BACKEND MAPPER!")
-        print("   The mapper can successfully parse and execute this workflow.")
+        verdict = (
+            "✅ NEW WORKFLOW JSON IS COMPATIBLE WITH BACKEND MAPPER!",
+            "   The mapper can successfully parse and execute this workflow."
+        )
     else:
-        print("❌ NEW WORKFLOW JSON HAS COMPATIBILITY ISSUES")
-        print("   Please fix the issues above before using this workflow.")
+        verdict = (
+            "❌ NEW WORKFLOW JSON HAS COMPATIBILITY ISSUES",
+            "   Please fix the issues above before using this workflow."
+        )
+    sys.stdout.write("\n".join(["\n" + "=" * 50, *verdict]) + "\n")
     
     return coverage_ok
 
@@ -6,22 +6,40 @@ This script demonstrates the Prefect-based workflow management capabilities
 for the SDL1 system.
 """
 
-import json
-import asyncio
 import logging
 import sys
 import os
-from datetime import datetime, timedelta
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from helpers import (
+    DATA_DIR, add_src_path, dry_controller, load_workflow_json, run_buffered, task_output
+)
+
+_WORKFLOW_JSON = DATA_DIR / "test_workflow-1753364156528.json"
 
 # Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+add_src_path()
+
+# Import the workflow management modules once; each test reports the
+# failure instead of importing again
+try:
+    from workflow_manager_factory import (
+        UnifiedWorkflowInterface, WorkflowManagerFactory, WorkflowManagerType
+    )
+    from prefect_deployment_manager import PrefectDeploymentManager
+    from prefect_cli import PrefectCLI
+    _PREFECT_AVAILABLE = True
+    _IMPORT_ERROR = None
+except ImportError as e:
+    _PREFECT_AVAILABLE = False
+    _IMPORT_ERROR = e
 
 # Setup logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
+logger = logging.getLogger(__name__)
 
 def test_prefect_availability():
     """Test if Prefect is available"""
@@ -40,31 +58,30 @@ def test_workflow_manager_factory():
     """Test the workflow manager factory"""
     print("\n=== Testing Workflow Manager Factory ===")
     
+    if not _PREFECT_AVAILABLE:
+        print(f"❌ Factory test failed: {_IMPORT_ERROR}")
+        return False
+    
     try:
-        from workflow_manager_factory import WorkflowManagerFactory, WorkflowManagerType
-        from opentrons_functions import OpentronsController
-        
         # Test getting available managers
         managers = WorkflowManagerFactory.get_available_managers()
         print(f"Available managers: {list(managers.keys())}")
         
+        out = []
         for manager_type, info in managers.items():
             status = "✅ Available" if info['available'] else "❌ Not Available"
-            print(f"  {manager_type}: {status}")
-            print(f"    Features: {len(info['features'])} features")
+            out.append(f"  {manager_type}: {status}")
+            out.append(f"    Features: {len(info['features'])} features")
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         # Test creating native manager
-        controller = OpentronsController(dry_run=True)
-        native_manager = WorkflowManagerFactory.create_manager(
-            WorkflowManagerType.NATIVE, controller
-        )
+        native_manager = WorkflowManagerFactory.create_manager(WorkflowManagerType.NATIVE, dry_controller())
         print(f"✅ Created native manager: {type(native_manager).__name__}")
         
         # Test creating Prefect manager (if available)
         if managers['prefect']['available']:
-            prefect_manager = WorkflowManagerFactory.create_manager(
-                WorkflowManagerType.PREFECT, controller
-            )
+            prefect_manager = WorkflowManagerFactory.create_manager(WorkflowManagerType.PREFECT, dry_controller())
             print(f"✅ Created Prefect manager: {type(prefect_manager).__name__}")
         else:
             print("⚠️  Prefect manager not available")
@@ -75,21 +92,21 @@ def test_workflow_manager_factory():
         print(f"❌ Factory test failed: {str(e)}")
         return False
 
-def test_unified_interface():
+def test_unified_interface(canvas_new):
     """Test the unified workflow interface"""
     print("\n=== Testing Unified Workflow Interface ===")
     
+    if not _PREFECT_AVAILABLE:
+        print(f"❌ Unified interface test failed: {_IMPORT_ERROR}")
+        return False
+    
     try:
-        from workflow_manager_factory import UnifiedWorkflowInterface, WorkflowManagerType
-        
-        # Load test workflow
-        workflow_file = Path("../data/test_workflow-1753364156528.json")
-        if not workflow_file.exists():
-            print(f"❌ Test workflow file not found: {workflow_file}")
+        # Test workflow (None when the file is missing)
+        if canvas_new is None:
+            print(f"❌ Test workflow file not found: {_WORKFLOW_JSON}")
             return False
         
-        with open(workflow_file, 'r') as f:
-            workflow_json = json.load(f)
+        workflow_json = canvas_new
         
         print(f"Loaded workflow: {workflow_json['metadata']['name']}")
         
@@ -123,20 +140,19 @@ def test_unified_interface():
         
     except Exception as e:
         print(f"❌ Unified interface test failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("test_unified_interface failed")
         return False
 
 async def test_prefect_deployment_manager():
     """Test Prefect deployment management"""
     print("\n=== Testing Prefect Deployment Manager ===")
     
+    if not _PREFECT_AVAILABLE:
+        print("❌ Prefect deployment manager not available")
+        return False
+    
     try:
-        from prefect_deployment_manager import PrefectDeploymentManager
-        from opentrons_functions import OpentronsController
-        
-        controller = OpentronsController(dry_run=True)
-        deployment_manager = PrefectDeploymentManager(controller)
+        deployment_manager = PrefectDeploymentManager(dry_controller())
         
         print("✅ Created Prefect deployment manager")
         
@@ -169,20 +185,25 @@ def test_manager_recommendations():
     """Test manager recommendation system"""
     print("\n=== Testing Manager Recommendations ===")
     
+    if not _PREFECT_AVAILABLE:
+        print(f"❌ Recommendation test failed: {_IMPORT_ERROR}")
+        return False
+    
     try:
-        from workflow_manager_factory import WorkflowManagerFactory
-        
         use_cases = ["basic", "production", "research", "development"]
         
+        out = []
         for use_case in use_cases:
             recommendation = WorkflowManagerFactory.recommend_manager(use_case)
-            print(f"\n{use_case.title()} use case:")
-            print(f"  Recommended: {recommendation['recommended']}")
-            print(f"  Reasoning: {recommendation['reasoning']}")
+            out.append(f"\n{use_case.title()} use case:")
+            out.append(f"  Recommended: {recommendation['recommended']}")
+            out.append(f"  Reasoning: {recommendation['reasoning']}")
             if recommendation.get('alternative'):
-                print(f"  Alternative: {recommendation['alternative']}")
+                out.append(f"  Alternative: {recommendation['alternative']}")
             if recommendation.get('suggestion'):
-                print(f"  Suggestion: {recommendation['suggestion']}")
+                out.append(f"  Suggestion: {recommendation['suggestion']}")
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         return True
         
@@ -194,9 +215,11 @@ def test_cli_functionality():
     """Test CLI functionality (without actually running commands)"""
     print("\n=== Testing CLI Functionality ===")
     
+    if not _PREFECT_AVAILABLE:
+        print(f"❌ CLI test failed: {_IMPORT_ERROR}")
+        return False
+    
     try:
-        from prefect_cli import PrefectCLI
-        
         cli = PrefectCLI()
         print("✅ Created Prefect CLI instance")
         
@@ -218,11 +241,14 @@ def main():
     print("🧪 Testing Prefect Workflow Management for SDL1")
     print("=" * 60)
     
+    # Parse the test workflow once; pytest passes the conftest fixture instead
+    canvas_new = load_workflow_json(_WORKFLOW_JSON) if _WORKFLOW_JSON.exists() else None
+    
     # Run tests
     tests = [
         ("Prefect Availability", test_prefect_availability),
         ("Workflow Manager Factory", test_workflow_manager_factory),
-        ("Unified Interface", test_unified_interface),
+        ("Unified Interface", lambda: test_unified_interface(canvas_new)),
         ("Manager Recommendations", test_manager_recommendations),
         ("CLI Functionality", test_cli_functionality)
     ]
@@ -234,49 +260,58 @@ def main():
     
     results = []
     
-    # Run synchronous tests
-    for test_name, test_func in tests:
-        print(f"\n{'='*40}")
-        print(f"Running: {test_name}")
-        print(f"{'='*40}")
-        
-        try:
-            result = test_func()
-            results.append((test_name, result))
-        except Exception as e:
-            print(f"❌ Test failed with exception: {str(e)}")
-            results.append((test_name, False))
+    # Run synchronous tests concurrently, each with its own output buffer
+    outputs = {}
+    with task_output(), ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        futures = {
+            executor.submit(run_buffered, test_func): test_name
+            for test_name, test_func in tests
+        }
+        for future in as_completed(futures):
+            outputs[futures[future]] = future.result()
     
-    # Run async tests
-    for test_name, test_func in async_tests:
+    for test_name, _ in tests:
+        result, output = outputs[test_name]
         print(f"\n{'='*40}")
         print(f"Running: {test_name}")
         print(f"{'='*40}")
-        
-        try:
-            result = asyncio.run(test_func())
-            results.append((test_name, result))
-        except Exception as e:
-            print(f"❌ Test failed with exception: {str(e)}")
-            results.append((test_name, False))
+        sys.stdout.write(output)
+        results.append((test_name, result))
     
-    # Summary
-    print(f"\n{'='*60}")
-    print("📊 Test Summary")
-    print(f"{'='*60}")
+    # Run async tests together in one event loop
+    import asyncio
+    
+    async def run_async_tests():
+        return await asyncio.gather(
+            *(test_func() for _, test_func in async_tests),
+            return_exceptions=True
+        )
     
+    print(f"\n{'='*40}")
+    print(f"Running: {', '.join(test_name for test_name, _ in async_tests)}")
+    print(f"{'='*40}")
+    
+    for (test_name, _), result in zip(async_tests, asyncio.run(run_async_tests())):
+        if isinstance(result, Exception):
+            print(f"❌ Test failed with exception: {str(result)}")
+            result = False
+        results.append((test_name, result))
+    
+    # Summary
     passed = sum(1 for _, result in results if result)
     total = len(results)
     
-    print(f"Total tests: {total}")
-    print(f"Passed: {passed}")
-    print(f"Failed: {total - passed}")
-    print(f"Success rate: {(passed/total*100):.1f}%")
-    
-    print(f"\n📋 Individual Results:")
-    for test_name, result in results:
-        status = "✅ PASS" if result else "❌ FAIL"
-        print(f"  {status} | {test_name}")
+    sys.stdout.write("\n".join([
+        f"\n{'='*60}",
+        "📊 Test Summary",
+        f"{'='*60}",
+        f"Total tests: {total}",
+        f"Passed: {passed}",
+        f"Failed: {total - passed}",
+        f"Success rate: {(passed/total*100):.1f}%",
+        f"\n📋 Individual Results:",
+        *(f"  {'✅ PASS' if result else '❌ FAIL'} | {test_name}" for test_name, result in results)
+    ]) + "\n")
     
     if passed == total:
         print(f"\n🎉 All tests passed! Prefect workflow management is working correctly.")
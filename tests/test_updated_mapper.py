@@ -2,20 +2,97 @@
 """
 Test script for the updated mapper with new JSON format
 Tests all SDL1 operations with the new Canvas JSON structure
+
+Set SDL_TEST_MODE=quick to skip the per-node diagnostics and only check
+that every node type is known to the mapper (default: full).
 """
 
-import json
 import logging
 import sys
 import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from helpers import (
+    STREAM_THRESHOLD, add_src_path, ijson, iter_json_items, load_workflow_json, run_buffered,
+    task_output
+)
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
+# Make src/ importable once, then import the modules under test
+add_src_path()
+
+try:
+    from sdl1_operations import SDL1Operations
+    from workflow_mapper import WorkflowMapper
+    _IMPORT_ERROR = None
+except ImportError as e:
+    _IMPORT_ERROR = e
+
+# "quick" skips the per-node diagnostics in test_mapper_with_new_json
+_MODE = os.environ.get('SDL_TEST_MODE', 'full')
+
+# Shared stand-in for nodes without params; read-only, never mutated
+_EMPTY_PARAMS = {}
+
+# Common parameters every SDL1 node must carry
+_REQUIRED_PARAMS = frozenset(("uo_name", "description", "error_handling", "log_level"))
+
+# Sample parameters for test_specific_operations; SDL1Operations only reads them
+_SETUP_PARAMS = {
+    "uo_name": "Test_Setup",
+    "description": "Test experiment setup",
+    "error_handling": "stop",
+    "log_level": "INFO",
+    "experiment_id": "Test_Experiment",
+    "test_well_address": "A1",
+    "robot_ip": "169.254.69.185",
+    "robot_port": 80,
+    "squidstat_port": "COM4",
+    "squidstat_channel": 0,
+    "validate_hardware_connection": False,
+    "check_pipette_tips": False,
+    "verify_well_availability": True
+}
+
+_COUNTER_PARAMS = {
+    "uo_name": "Test_Counter",
+    "description": "Test cycle counter",
+    "error_handling": "stop",
+    "log_level": "INFO",
+    "current_cycle": 1,
+    "total_cycles": 5,
+    "cycle_type": "electrochemical",
+    "display_enabled": True,
+    "show_progress": True,
+    "show_statistics": True
+}
+
+_MEASUREMENT_PARAMS = {
+    "uo_name": "Test_Measurement",
+    "description": "Test electrochemical measurement",
+    "error_handling": "stop",
+    "log_level": "INFO",
+    "com_port": "COM4",
+    "channel": 0,
+    "measurement_type": "CP",
+    "cp_current": -0.004,
+    "cp_duration": 720,
+    "cp_sample_interval": 1,
+    "data_collection_enabled": True
+}
+
+CANVAS_PATH = '../data/test_workflow-1753364156528.json'
+
+# Mock hardware calls log here, formatting only when INFO is enabled
+mock_log = logging.getLogger('mock_ot')
+
 class MockOpentronsController:
     """Mock controller for testing without Opentrons dependency"""
     
@@ -25,92 +102,105 @@ class MockOpentronsController:
         self.pipettes = {}
         
     def delay(self, seconds, message=""):
-        logging.info(f"DELAY: {seconds}s - {message}")
+        mock_log.info("DELAY: %ss - %s", seconds, message)
         
     def load_labware(self, slot, labware_type):
         self.labware[slot] = labware_type
-        logging.info(f"LOAD_LABWARE: Slot {slot} - {labware_type}")
+        mock_log.info("LOAD_LABWARE: Slot %s - %s", slot, labware_type)
         
     def load_custom_labware(self, slot, labware_file):
         self.labware[slot] = labware_file
-        logging.info(f"LOAD_CUSTOM_LABWARE: Slot {slot} - {labware_file}")
+        mock_log.info("LOAD_CUSTOM_LABWARE: Slot %s - %s", slot, labware_file)
         
     def load_pipette(self, pipette_type, mount):
         self.pipettes[mount] = pipette_type
-        logging.info(f"LOAD_PIPETTE: {pipette_type} on {mount}")
+        mock_log.info("LOAD_PIPETTE: %s on %s", pipette_type, mount)
         
     def fill_well(self, **kwargs):
-        logging.info(f"FILL_WELL: {kwargs}")
+        if mock_log.isEnabledFor(logging.INFO):
+            mock_log.info("FILL_WELL: %s", kwargs)
         return {"status": "success", "message": "Well filled"}
         
     def move_to_well(self, **kwargs):
-        logging.info(f"MOVE_TO_WELL: {kwargs}")
+        if mock_log.isEnabledFor(logging.INFO):
+            mock_log.info("MOVE_TO_WELL: %s", kwargs)
         return {"status": "success", "message": "Moved to well"}
 
+class _StreamingController(MockOpentronsController):
+    """MockOpentronsController that also answers the calls WorkflowMapper binds at init"""
+    
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: {"status": "success", "message": name}
+
 def test_mapper_with_new_json():
     """Test the updated mapper with the new JSON format"""
     print("=== Testing Updated Mapper with New JSON Format ===")
     
     try:
-        # Import the updated modules
-        sys.path.append('.')
-        from sdl1_operations import SDL1Operations
-        from workflow_mapper import WorkflowMapper
+        if _IMPORT_ERROR is not None:
+            raise ImportError(str(_IMPORT_ERROR)) from _IMPORT_ERROR
         
         # Load the new Canvas JSON
-        with open('test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
+        canvas_json = load_workflow_json(CANVAS_PATH)
         
         print(f"✅ Loaded Canvas workflow: {canvas_json['metadata']['name']}")
         print(f"Node count: {len(canvas_json['workflow']['nodes'])}")
         
         # Initialize with mock controller
         mock_controller = MockOpentronsController(dry_run=True)
-        sdl1_ops = SDL1Operations(mock_controller)
         mapper = WorkflowMapper(mock_controller)
         
         # Test each node type individually
         nodes = canvas_json['workflow']['nodes']
         
-        for i, node in enumerate(nodes):
-            node_type = node.get('type')
-            node_id = node.get('id')
-            node_params = node.get('params', {})
+        if _MODE == 'quick':
+            print("Quick mode: checking node types only")
+            return all(n.get('type') in mapper.function_map for n in nodes)
+        
+        # Validate every node up front: (node, params, missing params, known type)
+        fmap_keys = frozenset(mapper.function_map.keys())
+        validated = [
+            (node, (params := node.get('params') or _EMPTY_PARAMS),
+             _REQUIRED_PARAMS.difference(params), node.get('type') in fmap_keys)
+            for node in nodes
+        ]
+        
+        out = []
+        for i, (node, node_params, missing_params, known) in enumerate(validated):
+            node_type, node_id = node.get('type'), node.get('id')
             
-            print(f"\n--- Testing Node {i+1}: {node_type} ---")
-            print(f"ID: {node_id}")
-            print(f"Params count: {len(node_params)}")
+            out.append(f"\n--- Testing Node {i+1}: {node_type} ---")
+            out.append(f"ID: {node_id}")
+            out.append(f"Params count: {len(node_params)}")
             
             # Check if the operation is available in the mapper
-            if node_type in mapper.function_map:
-                print(f"✅ Operation {node_type} found in mapper")
+            if known:
+                out.append(f"✅ Operation {node_type} found in mapper")
                 
                 # Test parameter extraction
-                required_params = ["uo_name", "description", "error_handling", "log_level"]
-                missing_params = [p for p in required_params if p not in node_params]
-                
                 if missing_params:
-                    print(f"⚠️  Missing required params: {missing_params}")
+                    out.append(f"⚠️  Missing required params: {sorted(missing_params)}")
                 else:
-                    print(f"✅ All required params present")
+                    out.append(f"✅ All required params present")
                 
                 # Test execution (dry run)
                 try:
                     result = mapper.execute_node(node)
-                    print(f"✅ Execution result: {result.get('status', 'unknown')}")
-                    if result.get('status') == 'error':
-                        print(f"   Error: {result.get('message', 'Unknown error')}")
+                    out.append(f"✅ Execution result: {(status := result.get('status', 'unknown'))}")
+                    if status == 'error':
+                        out.append(f"   Error: {result.get('message', 'Unknown error')}")
                 except Exception as e:
-                    print(f"❌ Execution failed: {str(e)}")
+                    out.append(f"❌ Execution failed: {str(e)}")
                     
             else:
-                print(f"❌ Operation {node_type} NOT found in mapper")
+                out.append(f"❌ Operation {node_type} NOT found in mapper")
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         return True
         
     except Exception as e:
         print(f"❌ Test failed: {str(e)}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -119,8 +209,8 @@ def test_specific_operations():
     print("\n=== Testing Specific Operations ===")
     
     try:
-        sys.path.append('.')
-        from sdl1_operations import SDL1Operations
+        if _IMPORT_ERROR is not None:
+            raise ImportError(str(_IMPORT_ERROR)) from _IMPORT_ERROR
         
         # Initialize with mock controller
         mock_controller = MockOpentronsController(dry_run=True)
@@ -128,67 +218,26 @@ def test_specific_operations():
         
         # Test sdl1ExperimentSetup
         print("\n--- Testing sdl1ExperimentSetup ---")
-        setup_params = {
-            "uo_name": "Test_Setup",
-            "description": "Test experiment setup",
-            "error_handling": "stop",
-            "log_level": "INFO",
-            "experiment_id": "Test_Experiment",
-            "test_well_address": "A1",
-            "robot_ip": "169.254.69.185",
-            "robot_port": 80,
-            "squidstat_port": "COM4",
-            "squidstat_channel": 0,
-            "validate_hardware_connection": False,
-            "check_pipette_tips": False,
-            "verify_well_availability": True
-        }
-        
-        result = sdl1_ops.sdl1ExperimentSetup(setup_params)
-        print(f"Result: {result.get('status')} - {result.get('message')}")
+        result = sdl1_ops.sdl1ExperimentSetup(_SETUP_PARAMS)
+        status, message = result.get('status'), result.get('message')
+        print(f"Result: {status} - {message}")
         
         # Test sdl1CycleCounter
         print("\n--- Testing sdl1CycleCounter ---")
-        counter_params = {
-            "uo_name": "Test_Counter",
-            "description": "Test cycle counter",
-            "error_handling": "stop",
-            "log_level": "INFO",
-            "current_cycle": 1,
-            "total_cycles": 5,
-            "cycle_type": "electrochemical",
-            "display_enabled": True,
-            "show_progress": True,
-            "show_statistics": True
-        }
-        
-        result = sdl1_ops.sdl1CycleCounter(counter_params)
-        print(f"Result: {result.get('status')} - {result.get('message')}")
+        result = sdl1_ops.sdl1CycleCounter(_COUNTER_PARAMS)
+        status, message = result.get('status'), result.get('message')
+        print(f"Result: {status} - {message}")
         
         # Test sdl1ElectrochemicalMeasurement with new format
         print("\n--- Testing sdl1ElectrochemicalMeasurement (New Format) ---")
-        measurement_params = {
-            "uo_name": "Test_Measurement",
-            "description": "Test electrochemical measurement",
-            "error_handling": "stop",
-            "log_level": "INFO",
-            "com_port": "COM4",
-            "channel": 0,
-            "measurement_type": "CP",
-            "cp_current": -0.004,
-            "cp_duration": 720,
-            "cp_sample_interval": 1,
-            "data_collection_enabled": True
-        }
-        
-        result = sdl1_ops.sdl1ElectrochemicalMeasurement(measurement_params)
-        print(f"Result: {result.get('status')} - {result.get('message')}")
+        result = sdl1_ops.sdl1ElectrochemicalMeasurement(_MEASUREMENT_PARAMS)
+        status, message = result.get('status'), result.get('message')
+        print(f"Result: {status} - {message}")
         
         return True
         
     except Exception as e:
         print(f"❌ Specific operations test failed: {str(e)}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -197,37 +246,80 @@ def test_workflow_execution():
     print("\n=== Testing Full Workflow Execution ===")
     
     try:
-        sys.path.append('.')
-        from workflow_mapper import WorkflowMapper
-        
-        # Load the new Canvas JSON
-        with open('test_workflow-1753364156528.json', 'r') as f:
-            canvas_json = json.load(f)
+        if _IMPORT_ERROR is not None:
+            raise ImportError(str(_IMPORT_ERROR)) from _IMPORT_ERROR
         
         # Initialize with mock controller
         mock_controller = MockOpentronsController(dry_run=True)
         mapper = WorkflowMapper(mock_controller)
         
-        # Execute the full Canvas workflow
+        # Execute the full Canvas workflow; very large files are streamed
         print("Executing full Canvas workflow...")
-        result = mapper.execute_canvas_workflow(canvas_json)
+        if ijson is not None and os.path.getsize(CANVAS_PATH) > STREAM_THRESHOLD:
+            mapper.sdl1_ops.clear_experiment_data()
+            result = mapper.execute_workflow(iter_json_items(CANVAS_PATH, 'workflow.nodes.item'))
+        else:
+            result = mapper.execute_canvas_workflow(load_workflow_json(CANVAS_PATH))
+        
+        status = result.get('status')
+        failed_nodes = result.get('failed_nodes', [])
         
         print(f"✅ Workflow execution completed")
-        print(f"Status: {result.get('status')}")
+        print(f"Status: {status}")
         print(f"Executed nodes: {result.get('executed_nodes', 0)}")
         print(f"Successful nodes: {result.get('successful_nodes', 0)}")
-        print(f"Failed nodes: {len(result.get('failed_nodes', []))}")
+        print(f"Failed nodes: {len(failed_nodes)}")
         
-        if result.get('failed_nodes'):
+        if failed_nodes:
             print("Failed nodes:")
-            for failed in result.get('failed_nodes', []):
+            for failed in failed_nodes:
                 print(f"  - {failed}")
         
-        return result.get('status') == 'success'
+        return status == 'success'
         
     except Exception as e:
         print(f"❌ Workflow execution test failed: {str(e)}")
-        import traceback
+        traceback.print_exc()
+        return False
+
+def test_streamed_workflow_execution():
+    """Test execute_workflow with a generator of nodes instead of a list"""
+    print("\n=== Testing Streamed Workflow Execution ===")
+    
+    try:
+        if _IMPORT_ERROR is not None:
+            raise ImportError(str(_IMPORT_ERROR)) from _IMPORT_ERROR
+        
+        mapper = WorkflowMapper(_StreamingController(dry_run=True))
+        
+        # Two successes, one failure that continues, then one that stops the
+        # run; the last node must never be pulled from the generator
+        nodes = [
+            {"id": "home_1", "type": "home_robot", "params": {}},
+            {"id": "bad_1", "type": "unknownNode", "params": {"error_handling": "continue"}},
+            {"id": "home_2", "type": "home_robot", "params": {}},
+            {"id": "bad_2", "type": "unknownNode", "params": {"error_handling": "stop"}},
+            {"id": "home_3", "type": "home_robot", "params": {}}
+        ]
+        stream = iter(nodes)
+        
+        # A generator has no len(), so total_nodes counts the nodes consumed
+        result = mapper.execute_workflow(node for node in stream)
+        counts = (result['total_nodes'], result['executed_nodes'], result['successful_nodes'])
+        
+        print(f"Total/executed/successful nodes: {counts}")
+        if counts != (4, 4, 2):
+            print("❌ Expected (4, 4, 2)")
+            return False
+        if next(stream, None) is not nodes[4]:
+            print("❌ Nodes after the stop policy were consumed")
+            return False
+        
+        print("✅ Streamed node counts match the nodes consumed")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Streamed workflow execution test failed: {str(e)}")
         traceback.print_exc()
         return False
 
@@ -236,14 +328,21 @@ def main():
     print("🧪 Testing Updated Mapper with New Canvas JSON Format")
     print("=" * 60)
     
-    # Test mapper compatibility
-    mapper_ok = test_mapper_with_new_json()
-    
-    # Test specific operations
-    operations_ok = test_specific_operations()
+    # The tests only share the read-only Canvas JSON and each builds its own
+    # mock controller, so they run concurrently; output is replayed in order
+    tests = (
+        test_mapper_with_new_json,
+        test_specific_operations,
+        test_workflow_execution,
+        test_streamed_workflow_execution
+    )
+    with task_output(), ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        futures = [executor.submit(run_buffered, test) for test in tests]
+        outcomes = [future.result() for future in futures]
     
-    # Test workflow execution
-    workflow_ok = test_workflow_execution()
+    for _, output in outcomes:
+        sys.stdout.write(output)
+    mapper_ok, operations_ok, workflow_ok, streamed_ok = (result for result, _ in outcomes)
     
     # Summary
     print("\n" + "=" * 60)
@@ -251,13 +350,14 @@ def main():
     print(f"Mapper Compatibility: {'✅ PASS' if mapper_ok else '❌ FAIL'}")
     print(f"Specific Operations: {'✅ PASS' if operations_ok else '❌ FAIL'}")
     print(f"Workflow Execution: {'✅ PASS' if workflow_ok else '❌ FAIL'}")
+    print(f"Streamed Execution: {'✅ PASS' if streamed_ok else '❌ FAIL'}")
     
-    if mapper_ok and operations_ok and workflow_ok:
+    if mapper_ok and operations_ok and workflow_ok and streamed_ok:
         print("\n🎉 All tests passed! The updated mapper works with the new JSON format.")
     else:
         print("\n⚠️  Some tests failed. Check the logs above for details.")
     
-    return mapper_ok and operations_ok and workflow_ok
+    return mapper_ok and operations_ok and workflow_ok and streamed_ok
 
 if __name__ == "__main__":
     success = main()